@@ -1,16 +1,32 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Header, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 import trimesh
 import numpy as np
+from scipy import ndimage
+from skimage import measure
+from numba import cuda, njit, prange, set_num_threads
+import pyfqmr
 import tempfile
 import os
 import shutil
 from pathlib import Path
-import aiofiles
-from typing import Dict
+from urllib.parse import quote
+import anyio
+from typing import Dict, Optional, Tuple
+import functools
+import math
+from collections import OrderedDict
 import uuid
+import hashlib
+import gc
+import gzip
 import logging
+import asyncio
+import multiprocessing
+import json
+import struct
+from concurrent.futures import ProcessPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -33,11 +49,162 @@ PROCESSED_DIR = Path("processed")
 UPLOAD_DIR.mkdir(exist_ok=True)
 PROCESSED_DIR.mkdir(exist_ok=True)
 
-# File storage for tracking uploads
-file_storage: Dict[str, Dict] = {}
+# Internal Nginx location serving PROCESSED_DIR, e.g. "/_processed/" with
+#   location /_processed/ { internal; gzip_static on; alias /app/processed/; }
+# When set, downloads are handed to Nginx via X-Accel-Redirect
+ACCEL_REDIRECT_PREFIX = os.environ.get("ACCEL_REDIRECT_PREFIX")
 
-def validate_3d_file(file_path: str) -> bool:
-    """Validate if the uploaded file is a supported 3D model format."""
+# Grid resolution used for outer shell extraction
+SHELL_RESOLUTION = 64
+
+# Part of the output cache key: bump whenever the pipeline's output changes,
+# as processed/ persists across deploys
+PIPELINE_VERSION = 2
+
+# Shell methods whose output is closed by construction (no hole filling needed)
+WATERTIGHT_SHELL_METHODS = {'sdf', 'alpha_wrap', 'convex_hull'}
+
+# GLBs are gzipped once at export (level 6: most of the gain at a fraction of level 9's cost)
+GZIP_LEVEL = 6
+
+# Upload limits
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # 50MB
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB
+
+# File storage for tracking uploads, keyed by file_id (LRU-bounded)
+MAX_TRACKED_FILES = 256
+file_storage: "OrderedDict[str, Dict]" = OrderedDict()
+storage_lock = asyncio.Lock()
+
+def remove_files(paths) -> None:
+    """Remove the given files if they exist (blocking, run in a worker thread)."""
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+def clear_directory(directory: Path) -> int:
+    """Remove all files in a directory, keeping the directory (it may be a volume mount)."""
+    removed = 0
+    for file_path in directory.glob("*"):
+        if file_path.is_file():
+            os.remove(file_path)
+            removed += 1
+    return removed
+
+def write_gzip_copy(path: str, gzip_path: str) -> None:
+    """Write a gzip-compressed copy of a file."""
+    with open(path, 'rb') as src, gzip.open(gzip_path, 'wb', compresslevel=GZIP_LEVEL) as dst:
+        shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+
+def save_upload(src, dst_path: Path) -> Tuple[int, str]:
+    """
+    Copy an upload to disk in chunks, hashing as we go. Stops as soon as the
+    size limit is exceeded. Returns (bytes read, sha256 hex digest).
+    """
+    file_size = 0
+    content_hash = hashlib.sha256()
+    with open(dst_path, 'wb') as f:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            if file_size > MAX_UPLOAD_SIZE:
+                break
+            content_hash.update(chunk)
+            f.write(chunk)
+    return file_size, content_hash.hexdigest()
+
+async def store_file_info(file_id: str, info: Dict) -> None:
+    """Track a file, evicting (and deleting) the least recently used entries."""
+    evicted_paths = []
+    async with storage_lock:
+        file_storage[file_id] = info
+        file_storage.move_to_end(file_id)
+        while len(file_storage) > MAX_TRACKED_FILES:
+            evicted_id, evicted = file_storage.popitem(last=False)
+            evicted_paths.append(evicted.get('temp_path'))
+            # Outputs are shared between identical uploads
+            output_path = evicted.get('output_path')
+            if output_path and not any(other.get('output_path') == output_path for other in file_storage.values()):
+                evicted_paths.extend([output_path, f"{output_path}.gz"])
+            if evicted.get('cache_prefix'):
+                evicted_paths.extend(mesh_cache_paths(evicted['cache_prefix']))
+            logger.info(f"Evicted file from storage: {evicted_id}")
+    
+    if evicted_paths:
+        await anyio.to_thread.run_sync(remove_files, evicted_paths)
+
+async def get_file_info(file_id: Optional[str]) -> Optional[Dict]:
+    """Look up a tracked file and mark it as recently used."""
+    async with storage_lock:
+        if not file_id or file_id not in file_storage:
+            return None
+        file_storage.move_to_end(file_id)
+        return file_storage[file_id]
+
+async def update_file_info(file_info: Dict, updates: Dict) -> None:
+    """Update a tracked file's entry."""
+    async with storage_lock:
+        file_info.update(updates)
+
+def load_mesh(file_path: str, **kwargs) -> trimesh.Trimesh:
+    """Load a mesh file, combining scene geometries into a single mesh."""
+    mesh = trimesh.load(file_path, **kwargs)
+    
+    # Handle different mesh types
+    if isinstance(mesh, trimesh.Scene):
+        logger.info("Processing scene with multiple geometries")
+        if len(mesh.geometry) == 0:
+            raise ValueError("No geometry found in scene")
+        
+        # Get all meshes from the scene
+        meshes = []
+        for name, geom in mesh.geometry.items():
+            if isinstance(geom, trimesh.Trimesh):
+                meshes.append(geom)
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("Found mesh: %s with %d vertices", name, len(geom.vertices))
+        
+        if not meshes:
+            raise ValueError("No valid meshes found in scene")
+        
+        # Combine all meshes
+        if len(meshes) == 1:
+            mesh = meshes[0]
+        else:
+            mesh = trimesh.util.concatenate(meshes)
+            logger.info("Combined multiple meshes")
+    
+    elif not isinstance(mesh, trimesh.Trimesh):
+        raise ValueError("Could not load valid mesh geometry")
+    
+    return mesh
+
+def mesh_cache_paths(cache_prefix: str) -> Tuple[str, str]:
+    """Vertex and face array files of a mesh cache."""
+    return f"{cache_prefix}_v.npy", f"{cache_prefix}_f.npy"
+
+def save_mesh_cache(mesh: trimesh.Trimesh, cache_prefix: str) -> None:
+    """Save vertices (float32) and faces (uint32) as raw .npy arrays."""
+    vertices_path, faces_path = mesh_cache_paths(cache_prefix)
+    np.save(vertices_path, mesh.vertices.astype(np.float32))
+    np.save(faces_path, mesh.faces.astype(np.uint32))
+
+def load_mesh_cache(cache_prefix: str) -> trimesh.Trimesh:
+    """
+    Load a cached mesh without parsing or processing it. The arrays are
+    memory-mapped, but trimesh copies them into float64/int64 arrays.
+    """
+    vertices_path, faces_path = mesh_cache_paths(cache_prefix)
+    vertices = np.load(vertices_path, mmap_mode='r')
+    faces = np.load(faces_path, mmap_mode='r')
+    return trimesh.Trimesh(vertices, faces, process=False)
+
+def validate_3d_file(file_path: str, cache_prefix: Optional[str] = None) -> bool:
+    """
+    Validate if the uploaded file is a supported 3D model format.
+    If cache_prefix is given, the parsed mesh is saved as .npy arrays
+    so the optimization step does not have to parse the upload again
+    (a failed cache write raises, as it says nothing about the upload).
+    """
     try:
         # Check file extension
         extension = Path(file_path).suffix.lower()
@@ -49,16 +216,7 @@ def validate_3d_file(file_path: str) -> bool:
             
         # Try to load with trimesh to validate
         try:
-            mesh = trimesh.load(file_path)
-            if isinstance(mesh, trimesh.Scene):
-                if len(mesh.geometry) == 0:
-                    logger.error("Scene contains no geometry")
-                    return False
-            elif not isinstance(mesh, trimesh.Trimesh):
-                logger.error("File does not contain valid mesh data")
-                return False
-            logger.info("File validation successful")
-            return True
+            mesh = load_mesh(file_path)
         except Exception as e:
             logger.error(f"Failed to load mesh during validation: {e}")
             return False
@@ -66,8 +224,472 @@ def validate_3d_file(file_path: str) -> bool:
     except Exception as e:
         logger.error(f"File validation error: {e}")
         return False
+    
+    if cache_prefix:
+        save_mesh_cache(mesh, cache_prefix)
+    
+    logger.info("File validation successful")
+    return True
+
+def clean_mesh(mesh: trimesh.Trimesh) -> trimesh.Trimesh:
+    """
+    Drop degenerate and duplicate faces and unreferenced vertices in one pass.
+    Equivalent to remove_degenerate_faces / remove_duplicate_faces /
+    remove_unreferenced_vertices without rebuilding trimesh caches three times.
+    """
+    faces = mesh.faces
+    
+    # Faces that reference the same vertex twice
+    valid = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    faces = faces[valid]
+    
+    # Faces with the same vertices regardless of winding (keep original order)
+    _, keep = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+    faces = faces[np.sort(keep)]
+    
+    # Compact the vertex array to the vertices still referenced
+    used, inverse = np.unique(faces, return_inverse=True)
+    return trimesh.Trimesh(mesh.vertices[used], inverse.reshape(-1, 3), process=False)
+
+@functools.lru_cache(maxsize=None)
+def gpu_available() -> bool:
+    """Check for optional CuPy/cuCIM GPU support (evaluated lazily in each worker)."""
+    try:
+        import cupy as cp
+        import cucim.skimage.measure  # noqa: F401
+        return cp.cuda.runtime.getDeviceCount() > 0
+    except Exception:
+        return False
+
+def marching_cubes(volume: np.ndarray, spacing: Tuple[float, float, float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Run marching cubes at level 0 (positive inside), on the GPU when available."""
+    if gpu_available():
+        try:
+            import cupy as cp
+            from cucim.skimage import measure as gpu_measure
+            verts, faces, _, _ = gpu_measure.marching_cubes(
+                cp.asarray(volume), level=0.0, spacing=spacing, gradient_direction='ascent'
+            )
+            return cp.asnumpy(verts), cp.asnumpy(faces)
+        except Exception as e:
+            logger.warning(f"GPU marching cubes failed: {e}, using CPU")
+    
+    # Only visit cubes the surface can pass through
+    verts, faces, _, _ = measure.marching_cubes(
+        volume, level=0.0, spacing=spacing, gradient_direction='ascent', mask=surface_cube_mask(volume)
+    )
+    return verts, faces
+
+@njit(parallel=True, cache=True)
+def surface_cube_mask(volume):
+    """
+    Mark the grid cubes that straddle the zero level. The corner signs are
+    packed into the marching cubes case index, and all-outside (0) and
+    all-inside (255) cubes are left out. Corners exactly at zero keep their
+    cube. skimage reads the mask at each cube's largest corner.
+    """
+    nx, ny, nz = volume.shape
+    mask = np.zeros(volume.shape, dtype=np.bool_)
+    for i in prange(nx - 1):
+        for j in range(ny - 1):
+            for k in range(nz - 1):
+                inside = 0
+                outside = 0
+                bit = 0
+                for di in range(2):
+                    for dj in range(2):
+                        for dk in range(2):
+                            value = volume[i + di, j + dj, k + dk]
+                            if value > 0:
+                                inside |= 1 << bit
+                            elif value < 0:
+                                outside |= 1 << bit
+                            bit += 1
+                mask[i + 1, j + 1, k + 1] = inside != 255 and outside != 255
+    return mask
+
+@njit(cache=True)
+def point_triangle_distance(px, py, pz, a, b, c) -> float:
+    """Distance from a point to a triangle (closest point by Voronoi region)."""
+    abx, aby, abz = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+    acx, acy, acz = c[0] - a[0], c[1] - a[1], c[2] - a[2]
+    apx, apy, apz = px - a[0], py - a[1], pz - a[2]
+    d1 = abx * apx + aby * apy + abz * apz
+    d2 = acx * apx + acy * apy + acz * apz
+    if d1 <= 0.0 and d2 <= 0.0:
+        qx, qy, qz = a[0], a[1], a[2]
+    else:
+        bpx, bpy, bpz = px - b[0], py - b[1], pz - b[2]
+        d3 = abx * bpx + aby * bpy + abz * bpz
+        d4 = acx * bpx + acy * bpy + acz * bpz
+        cpx, cpy, cpz = px - c[0], py - c[1], pz - c[2]
+        d5 = abx * cpx + aby * cpy + abz * cpz
+        d6 = acx * cpx + acy * cpy + acz * cpz
+        vc = d1 * d4 - d3 * d2
+        vb = d5 * d2 - d1 * d6
+        va = d3 * d6 - d5 * d4
+        if d3 >= 0.0 and d4 <= d3:
+            qx, qy, qz = b[0], b[1], b[2]
+        elif d6 >= 0.0 and d5 <= d6:
+            qx, qy, qz = c[0], c[1], c[2]
+        elif vc <= 0.0 and d1 >= 0.0 and d3 <= 0.0:
+            v = d1 / (d1 - d3)
+            qx, qy, qz = a[0] + v * abx, a[1] + v * aby, a[2] + v * abz
+        elif vb <= 0.0 and d2 >= 0.0 and d6 <= 0.0:
+            w = d2 / (d2 - d6)
+            qx, qy, qz = a[0] + w * acx, a[1] + w * acy, a[2] + w * acz
+        elif va <= 0.0 and d4 - d3 >= 0.0 and d5 - d6 >= 0.0:
+            w = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+            qx, qy, qz = b[0] + w * (c[0] - b[0]), b[1] + w * (c[1] - b[1]), b[2] + w * (c[2] - b[2])
+        elif va + vb + vc > 0.0:
+            v = vb / (va + vb + vc)
+            w = vc / (va + vb + vc)
+            qx, qy, qz = a[0] + v * abx + w * acx, a[1] + v * aby + w * acy, a[2] + v * abz + w * acz
+        else:
+            # Collinear triangle, fall back to its first vertex
+            qx, qy, qz = a[0], a[1], a[2]
+    return math.sqrt((px - qx) ** 2 + (py - qy) ** 2 + (pz - qz) ** 2)
+
+point_triangle_distance_gpu = cuda.jit(device=True)(point_triangle_distance.py_func)
+
+@njit(parallel=True, cache=True)
+def rasterize_distance(vertices, faces, origin, spacing, radius, slice_start, slice_faces, distance):
+    """
+    Write the unsigned distance to the mesh into every grid node within
+    radius of a triangle. Threads own x-slices of the grid, so no writes race;
+    each slice only visits the triangles bucketed to it.
+    """
+    nx, ny, nz = distance.shape
+    for i in prange(nx):
+        x = origin[0] + i * spacing[0]
+        for n in range(slice_start[i], slice_start[i + 1]):
+            t = slice_faces[n]
+            a = vertices[faces[t, 0]]
+            b = vertices[faces[t, 1]]
+            c = vertices[faces[t, 2]]
+            j0 = max(0, int(np.ceil((min(a[1], b[1], c[1]) - radius - origin[1]) / spacing[1])))
+            j1 = min(ny - 1, int(np.floor((max(a[1], b[1], c[1]) + radius - origin[1]) / spacing[1])))
+            k0 = max(0, int(np.ceil((min(a[2], b[2], c[2]) - radius - origin[2]) / spacing[2])))
+            k1 = min(nz - 1, int(np.floor((max(a[2], b[2], c[2]) + radius - origin[2]) / spacing[2])))
+            for j in range(j0, j1 + 1):
+                y = origin[1] + j * spacing[1]
+                for k in range(k0, k1 + 1):
+                    d = point_triangle_distance(x, y, origin[2] + k * spacing[2], a, b, c)
+                    if d < distance[i, j, k]:
+                        distance[i, j, k] = d
+
+def bucket_faces_by_slice(vertices: np.ndarray, faces: np.ndarray, origin: np.ndarray,
+                          spacing: np.ndarray, radius: float, nx: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bucket triangles by the grid x-slices within radius of them (CSR layout):
+    slice i owns slice_faces[slice_start[i]:slice_start[i + 1]].
+    """
+    x = vertices[faces, 0]
+    first = np.clip(np.ceil((x.min(axis=1) - radius - origin[0]) / spacing[0]), 0, nx - 1).astype(np.int64)
+    last = np.clip(np.floor((x.max(axis=1) + radius - origin[0]) / spacing[0]), 0, nx - 1).astype(np.int64)
+    counts = np.maximum(last - first + 1, 0)
+    
+    # One entry per (slice, triangle) pair, grouped by slice
+    slice_faces = np.repeat(np.arange(len(faces)), counts)
+    slice_index = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    order = np.argsort(slice_index, kind='stable')
+    slice_start = np.searchsorted(slice_index[order], np.arange(nx + 1))
+    return slice_start, slice_faces[order]
+
+@cuda.jit
+def rasterize_distance_kernel(vertices, faces, origin, spacing, radius, distance):
+    """GPU rasterizer: one thread per triangle, merged with an atomic min."""
+    t = cuda.grid(1)
+    if t >= faces.shape[0]:
+        return
+    nx, ny, nz = distance.shape
+    a = vertices[faces[t, 0]]
+    b = vertices[faces[t, 1]]
+    c = vertices[faces[t, 2]]
+    i0 = max(0, int(math.ceil((min(a[0], b[0], c[0]) - radius - origin[0]) / spacing[0])))
+    i1 = min(nx - 1, int(math.floor((max(a[0], b[0], c[0]) + radius - origin[0]) / spacing[0])))
+    j0 = max(0, int(math.ceil((min(a[1], b[1], c[1]) - radius - origin[1]) / spacing[1])))
+    j1 = min(ny - 1, int(math.floor((max(a[1], b[1], c[1]) + radius - origin[1]) / spacing[1])))
+    k0 = max(0, int(math.ceil((min(a[2], b[2], c[2]) - radius - origin[2]) / spacing[2])))
+    k1 = min(nz - 1, int(math.floor((max(a[2], b[2], c[2]) + radius - origin[2]) / spacing[2])))
+    for i in range(i0, i1 + 1):
+        x = origin[0] + i * spacing[0]
+        for j in range(j0, j1 + 1):
+            y = origin[1] + j * spacing[1]
+            for k in range(k0, k1 + 1):
+                d = point_triangle_distance_gpu(x, y, origin[2] + k * spacing[2], a, b, c)
+                cuda.atomic.min(distance, (i, j, k), d)
+
+@functools.lru_cache(maxsize=None)
+def cuda_available() -> bool:
+    """Check for a CUDA device usable by numba (evaluated lazily in each worker)."""
+    try:
+        return cuda.is_available()
+    except Exception:
+        return False
+
+def rasterize_mesh_distance(mesh: trimesh.Trimesh, origin: np.ndarray, spacing: np.ndarray,
+                            radius: float, resolution: int) -> np.ndarray:
+    """Unsigned distance to the mesh on a grid, within radius (inf elsewhere)."""
+    vertices = np.ascontiguousarray(mesh.vertices)
+    faces = np.ascontiguousarray(mesh.faces)
+    distance = np.full((resolution,) * 3, np.inf, dtype=np.float32)
+    
+    if cuda_available():
+        try:
+            device_distance = cuda.to_device(distance)
+            threads = 128
+            blocks = (len(faces) + threads - 1) // threads
+            rasterize_distance_kernel[blocks, threads](
+                cuda.to_device(vertices), cuda.to_device(faces),
+                cuda.to_device(origin), cuda.to_device(spacing), radius, device_distance
+            )
+            return device_distance.copy_to_host()
+        except Exception as e:
+            logger.warning(f"GPU rasterization failed: {e}, using CPU")
+    
+    slice_start, slice_faces = bucket_faces_by_slice(vertices, faces, origin, spacing, radius, resolution)
+    rasterize_distance(vertices, faces, origin, spacing, radius, slice_start, slice_faces, distance)
+    return distance
+
+def sdf_outer_shell(mesh: trimesh.Trimesh, resolution: int = SHELL_RESOLUTION) -> trimesh.Trimesh:
+    """
+    Extract the outer surface with marching cubes on a distance field.
+    The surface sits about half a grid cell outside the mesh, like a voxel shell.
+    """
+    bounds = mesh.bounds
+    
+    # Pad the grid so the offset surface still closes inside it
+    pad = 2 * (bounds[1] - bounds[0]).max() / resolution
+    lo = bounds[0] - pad
+    hi = bounds[1] + pad
+    spacing = (hi - lo) / (resolution - 1)
+    
+    # Every grid line crossing the surface has a node within half a cell of it,
+    # so nodes within that offset form a closed band around the mesh
+    offset = 0.55 * spacing.max()
+    radius = 2 * spacing.max()
+    distance = rasterize_mesh_distance(mesh, lo, spacing, radius, resolution)
+    
+    # Fill what the band encloses, so nested inner geometry is dropped
+    band = distance <= offset
+    solid = ndimage.binary_fill_holes(band)
+    
+    # Field (float32) that is positive inside and crosses zero at the offset surface
+    field = np.float32(offset) - np.minimum(distance, np.float32(radius))
+    field[solid & ~band] = offset
+    
+    verts, faces = marching_cubes(field, tuple(spacing))
+    return trimesh.Trimesh(verts + lo, faces)
 
-def remove_inner_mesh_simple(input_path: str, output_path: str) -> bool:
+def alpha_wrap_shell(mesh: trimesh.Trimesh, relative_alpha: float = 20, relative_offset: float = 600) -> trimesh.Trimesh:
+    """
+    Wrap the mesh with CGAL's 3D alpha wrapping (optional `cgal` package).
+    Gives a watertight envelope even for broken input; alpha and offset are
+    fractions of the bounding box diagonal.
+    """
+    from CGAL.CGAL_Alpha_wrap_3 import alpha_wrap_3, Point_3_Vector, Polygon_Vector, Int_Vector
+    from CGAL.CGAL_Kernel import Point_3
+    from CGAL.CGAL_Polyhedron_3 import Polyhedron_3
+    
+    points = Point_3_Vector()
+    points.reserve(len(mesh.vertices))
+    for x, y, z in mesh.vertices.tolist():
+        points.append(Point_3(x, y, z))
+    polygons = Polygon_Vector()
+    for face in mesh.faces.tolist():
+        polygons.append(Int_Vector(face))
+    
+    diagonal = np.linalg.norm(mesh.extents)
+    wrap = Polyhedron_3()
+    alpha_wrap_3(points, polygons, diagonal / relative_alpha, diagonal / relative_offset, wrap)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        off_path = os.path.join(tmp, "wrap.off")
+        wrap.write_to_file(off_path)
+        return trimesh.load(off_path, process=False)
+
+def vertex_quadrics(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """Accumulate per-vertex error quadrics (Nx4x4) from the face planes."""
+    tri = vertices[faces]
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    normals /= np.where(lengths > 0, lengths, 1.0)[:, None]
+    planes = np.column_stack((normals, -np.einsum('ij,ij->i', normals, tri[:, 0])))
+    face_quadrics = (planes[:, :, None] * planes[:, None, :]).reshape(-1, 16)
+    
+    # Scatter each face quadric onto its three vertices
+    corners = faces.ravel()
+    quadrics = np.empty((len(vertices), 16))
+    for k in range(16):
+        quadrics[:, k] = np.bincount(corners, weights=np.repeat(face_quadrics[:, k], 3), minlength=len(vertices))
+    return quadrics.reshape(-1, 4, 4)
+
+def batched_qem(mesh: trimesh.Trimesh, target_faces: int, max_passes: int = 64) -> trimesh.Trimesh:
+    """
+    Batched quadric error simplification.
+    Each pass collapses a set of vertex-disjoint edges at once (every edge that
+    is the cheapest for both of its endpoints) instead of one edge per heap pop.
+    """
+    vertices = np.array(mesh.vertices, dtype=np.float64)
+    faces = np.array(mesh.faces, dtype=np.int64)
+    
+    for _ in range(max_passes):
+        if len(faces) <= target_faces:
+            break
+        
+        # Candidate edges and their midpoint collapse cost
+        edges = np.unique(np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1), axis=0)
+        quadrics = vertex_quadrics(vertices, faces)
+        midpoints = (vertices[edges[:, 0]] + vertices[edges[:, 1]]) / 2
+        homogeneous = np.column_stack((midpoints, np.ones(len(edges))))
+        edge_quadrics = quadrics[edges[:, 0]] + quadrics[edges[:, 1]]
+        cost = np.einsum('ei,eij,ej->e', homogeneous, edge_quadrics, homogeneous)
+        
+        # Cheapest incident edge for every vertex
+        endpoints = edges.T.ravel()
+        edge_ids = np.tile(np.arange(len(edges)), 2)
+        order = np.lexsort((cost[edge_ids], endpoints))
+        ends, first = np.unique(endpoints[order], return_index=True)
+        best_edge = np.full(len(vertices), -1)
+        best_edge[ends] = edge_ids[order][first]
+        
+        # Edges that are the cheapest for both endpoints are vertex-disjoint
+        edge_range = np.arange(len(edges))
+        selected = edge_range[(best_edge[edges[:, 0]] == edge_range) & (best_edge[edges[:, 1]] == edge_range)]
+        if len(selected) == 0:
+            break
+        
+        # Each collapse removes roughly two faces; don't overshoot the target
+        needed = max(1, (len(faces) - target_faces + 1) // 2)
+        selected = selected[np.argsort(cost[selected])[:needed]]
+        
+        # Contract selected pairs onto their first vertex
+        keep, drop = edges[selected, 0], edges[selected, 1]
+        vertices[keep] = midpoints[selected]
+        remap = np.arange(len(vertices))
+        remap[drop] = keep
+        faces = remap[faces]
+        
+        # Drop faces that collapsed to a line
+        valid = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+        faces = faces[valid]
+    
+    # Compact the vertex array to the vertices still referenced
+    used, inverse = np.unique(faces, return_inverse=True)
+    return trimesh.Trimesh(vertices[used], inverse.reshape(-1, 3))
+
+def export_quantized_glb(mesh: trimesh.Trimesh, output_path: str) -> None:
+    """
+    Export a GLB with quantized attributes (KHR_mesh_quantization):
+    uint16 positions dequantized by the node transform and int8 normals.
+    """
+    vertices = np.asarray(mesh.vertices, dtype=np.float64)
+    bmin = vertices.min(axis=0)
+    # One scale for all axes: a non-uniform node scale would skew the normals,
+    # which viewers transform by the inverse-transpose of the node matrix
+    extent = float((vertices.max(axis=0) - bmin).max()) or 1.0
+    
+    # Attributes padded to 4 components to keep vertex strides 4-byte aligned
+    positions = np.zeros((len(vertices), 4), dtype=np.uint16)
+    positions[:, :3] = np.round((vertices - bmin) / extent * 65535)
+    normals = np.zeros((len(vertices), 4), dtype=np.int8)
+    normals[:, :3] = np.clip(np.round(mesh.vertex_normals * 127), -127, 127)
+    index_dtype, index_type = (np.uint16, 5123) if len(vertices) < 65536 else (np.uint32, 5125)
+    indices = mesh.faces.astype(index_dtype).ravel()
+    
+    # Pack buffer views on 4-byte boundaries
+    blobs = [positions.tobytes(), normals.tobytes(), indices.tobytes()]
+    buffer_views = []
+    binary = b''
+    for blob, stride, target in zip(blobs, (8, 4, None), (34962, 34962, 34963)):
+        view = {'buffer': 0, 'byteOffset': len(binary), 'byteLength': len(blob), 'target': target}
+        if stride:
+            view['byteStride'] = stride
+        buffer_views.append(view)
+        binary += blob + b'\x00' * (-len(blob) % 4)
+    
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'Karmic'},
+        'extensionsUsed': ['KHR_mesh_quantization'],
+        'extensionsRequired': ['KHR_mesh_quantization'],
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [{
+            'mesh': 0,
+            'translation': bmin.tolist(),
+            'scale': [extent / 65535] * 3
+        }],
+        'meshes': [{'primitives': [{'attributes': {'POSITION': 0, 'NORMAL': 1}, 'indices': 2}]}],
+        'accessors': [
+            {'bufferView': 0, 'componentType': 5123, 'count': len(vertices), 'type': 'VEC3',
+             'min': positions[:, :3].min(axis=0).tolist(), 'max': positions[:, :3].max(axis=0).tolist()},
+            {'bufferView': 1, 'componentType': 5120, 'normalized': True, 'count': len(vertices), 'type': 'VEC3'},
+            {'bufferView': 2, 'componentType': index_type, 'count': len(indices), 'type': 'SCALAR'}
+        ],
+        'bufferViews': buffer_views,
+        'buffers': [{'byteLength': len(binary)}]
+    }
+    
+    content = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    content += b' ' * (-len(content) % 4)
+    
+    with open(output_path, 'wb') as f:
+        f.write(struct.pack('<III', 0x46546C67, 2, 12 + 8 + len(content) + 8 + len(binary)))
+        f.write(struct.pack('<II', len(content), 0x4E4F534A))
+        f.write(content)
+        f.write(struct.pack('<II', len(binary), 0x004E4942))
+        f.write(binary)
+
+def simplify_mesh(mesh: trimesh.Trimesh, target_faces: int, closed: bool = False) -> trimesh.Trimesh:
+    """
+    Quadric simplification with pyfqmr, which collapses every edge under a
+    per-iteration error threshold instead of popping a global heap.
+    pyfqmr does not check topology, so when a closed input comes back with
+    non-manifold edges it is retried with gentler aggressiveness.
+    Falls back to batched_qem if pyfqmr fails.
+    """
+    try:
+        for aggressiveness in (7, 5, 3):
+            simplifier = pyfqmr.Simplify()
+            simplifier.setMesh(mesh.vertices, mesh.faces)
+            simplifier.simplify_mesh(
+                target_count=target_faces, aggressiveness=aggressiveness, preserve_border=True, verbose=False
+            )
+            vertices, faces, _ = simplifier.getMesh()
+            simplified = trimesh.Trimesh(vertices, faces)
+            if not closed or simplified.is_watertight:
+                return simplified
+            logger.warning(f"pyfqmr (aggressiveness {aggressiveness}) left the mesh open")
+        return simplified
+    except Exception as e:
+        logger.warning(f"pyfqmr simplification failed: {e}, using batched QEM")
+        return batched_qem(mesh, target_faces)
+
+# Outer shell methods in order of preference
+SHELL_METHODS = (
+    ('sdf', sdf_outer_shell),
+    ('alpha_wrap', alpha_wrap_shell),  # needs the optional cgal package
+    ('convex_hull', lambda mesh: mesh.convex_hull),
+)
+
+def extract_outer_shell(mesh: trimesh.Trimesh) -> Tuple[Optional[trimesh.Trimesh], str]:
+    """
+    Build the outer shell with the first method that succeeds. Returns the
+    shell and the method name, or (None, 'original') if every method failed.
+    """
+    for method, build_shell in SHELL_METHODS:
+        try:
+            shell = build_shell(mesh)
+            if len(shell.vertices) > 0:
+                logger.info(f"Outer shell from {method}: {len(shell.vertices)} vertices")
+                return shell, method
+            logger.warning(f"Outer shell from {method} is empty")
+        except Exception as e:
+            logger.warning(f"Outer shell from {method} failed: {e}")
+    return None, 'original'
+
+def remove_inner_mesh_simple(input_path: str, output_path: str, cache_prefix: Optional[str] = None) -> bool:
     """
     Simple but effective inner mesh removal using Trimesh.
     Focus on creating a clean outer shell.
@@ -75,93 +697,34 @@ def remove_inner_mesh_simple(input_path: str, output_path: str) -> bool:
     try:
         logger.info(f"Starting mesh processing: {input_path}")
         
-        # Load the mesh
-        mesh = trimesh.load(input_path)
-        
-        # Handle different mesh types
-        if isinstance(mesh, trimesh.Scene):
-            logger.info("Processing scene with multiple geometries")
-            if len(mesh.geometry) == 0:
-                raise ValueError("No geometry found in scene")
-            
-            # Get all meshes from the scene
-            meshes = []
-            for name, geom in mesh.geometry.items():
-                if isinstance(geom, trimesh.Trimesh):
-                    meshes.append(geom)
-                    logger.info(f"Found mesh: {name} with {len(geom.vertices)} vertices")
-            
-            if not meshes:
-                raise ValueError("No valid meshes found in scene")
-            
-            # Combine all meshes
-            if len(meshes) == 1:
-                mesh = meshes[0]
-            else:
-                mesh = trimesh.util.concatenate(meshes)
-                logger.info("Combined multiple meshes")
-        
-        elif not isinstance(mesh, trimesh.Trimesh):
-            raise ValueError("Could not load valid mesh geometry")
+        # Load the mesh, preferring the arrays cached during validation
+        if cache_prefix and all(os.path.exists(path) for path in mesh_cache_paths(cache_prefix)):
+            mesh = load_mesh_cache(cache_prefix)
+        else:
+            mesh = load_mesh(input_path)
         
         logger.info(f"Original mesh: {len(mesh.vertices)} vertices, {len(mesh.faces)} faces")
         
         # Step 1: Basic cleanup
         logger.info("Cleaning mesh...")
-        mesh.remove_duplicate_faces()
-        mesh.remove_unreferenced_vertices()
-        mesh.remove_degenerate_faces()
+        mesh = clean_mesh(mesh)
         
-        # Step 2: Create outer shell using voxelization
-        outer_shell = None
-        
-        try:
-            logger.info("Creating outer shell using voxelization...")
-            
-            # Calculate voxel size based on mesh bounds
-            bounds = mesh.bounds
-            size = bounds[1] - bounds[0]
-            max_dimension = max(size)
-            voxel_size = max_dimension / 64  # Reasonable resolution
-            
-            logger.info(f"Using voxel size: {voxel_size}")
-            
-            # Create voxel grid
-            voxel_grid = mesh.voxelized(pitch=voxel_size)
-            
-            # Extract surface using marching cubes
-            outer_shell = voxel_grid.marching_cubes
-            
-            if len(outer_shell.vertices) > 0:
-                logger.info(f"Voxelization successful: {len(outer_shell.vertices)} vertices")
-            else:
-                raise ValueError("Voxelization produced empty result")
-                
-        except Exception as e:
-            logger.warning(f"Voxelization failed: {e}, trying convex hull...")
-            
-            # Fallback to convex hull
-            try:
-                outer_shell = mesh.convex_hull
-                logger.info("Using convex hull as fallback")
-            except Exception as e2:
-                logger.warning(f"Convex hull failed: {e2}, using original mesh")
-                outer_shell = mesh
+        # Step 2: Create outer shell (signed distance field, then fallbacks)
+        logger.info(f"Creating outer shell using a {SHELL_RESOLUTION}^3 distance field...")
+        outer_shell, shell_method = extract_outer_shell(mesh)
         
         # Step 3: Post-processing
-        if outer_shell is None or len(outer_shell.vertices) == 0:
+        if outer_shell is None:
             logger.warning("All methods failed, using original mesh")
             outer_shell = mesh
         
         logger.info(f"Processing outer shell: {len(outer_shell.vertices)} vertices, {len(outer_shell.faces)} faces")
         
         # Clean the result
-        outer_shell.remove_duplicate_faces()
-        outer_shell.remove_unreferenced_vertices()
-        outer_shell.remove_degenerate_faces()
+        outer_shell = clean_mesh(outer_shell)
         
-        # Make watertight if possible
-        if not outer_shell.is_watertight:
+        # Make watertight if possible (the shell methods are closed by construction)
+        if shell_method not in WATERTIGHT_SHELL_METHODS and not outer_shell.is_watertight:
             logger.info("Attempting to make mesh watertight...")
             try:
                 outer_shell.fill_holes()
@@ -173,7 +736,8 @@ def remove_inner_mesh_simple(input_path: str, output_path: str) -> bool:
             logger.info("Simplifying complex mesh...")
             try:
                 target_faces = min(20000, len(outer_shell.faces) // 2)
-                outer_shell = outer_shell.simplify_quadric_decimation(face_count=target_faces)
+                closed = shell_method in WATERTIGHT_SHELL_METHODS or outer_shell.is_watertight
+                outer_shell = simplify_mesh(outer_shell, target_faces, closed)
                 logger.info(f"Simplified to {len(outer_shell.faces)} faces")
             except Exception as e:
                 logger.warning(f"Simplification failed: {e}")
@@ -187,8 +751,15 @@ def remove_inner_mesh_simple(input_path: str, output_path: str) -> bool:
         # Step 4: Export as GLB
         logger.info(f"Exporting final mesh: {len(outer_shell.vertices)} vertices, {len(outer_shell.faces)} faces")
         
-        # Export with proper settings
-        outer_shell.export(output_path, file_type='glb')
+        # Export with quantized vertex attributes plus a gzipped copy for downloads;
+        # write then rename (the .gz first) so a concurrent request for the same
+        # content never sees a partial file
+        partial_path = f"{output_path}.{os.getpid()}.part"
+        partial_gzip_path = f"{output_path}.gz.{os.getpid()}.part"
+        export_quantized_glb(outer_shell, partial_path)
+        write_gzip_copy(partial_path, partial_gzip_path)
+        os.replace(partial_gzip_path, f"{output_path}.gz")
+        os.replace(partial_path, output_path)
         
         # Verify output
         if not os.path.exists(output_path):
@@ -200,10 +771,64 @@ def remove_inner_mesh_simple(input_path: str, output_path: str) -> bool:
         return True
         
     except Exception as e:
-        logger.error(f"Error in mesh processing: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in mesh processing: {str(e)}")
         return False
+    
+    finally:
+        # Free trimesh's cyclic caches (adjacency, trees) before the worker idles
+        gc.collect()
+
+def warm_up_mesh_pipeline() -> None:
+    """
+    Run the pipeline once on a tiny mesh so lazy imports and first-call
+    setup happen when a worker starts, not on the first real request.
+    """
+    try:
+        mesh = trimesh.creation.box()
+        shell = clean_mesh(sdf_outer_shell(mesh))
+        simplify_mesh(shell, 8)
+        _ = mesh.convex_hull
+        shell.fix_normals()
+        with tempfile.TemporaryDirectory() as tmp:
+            export_quantized_glb(shell, os.path.join(tmp, "warm.glb"))
+    except Exception as e:
+        # A failed warm-up must not break the pool
+        logger.warning(f"Mesh worker warm-up failed: {e}")
+
+def init_mesh_worker() -> None:
+    """
+    Give each worker's numba thread pool an equal share of the CPUs (so the
+    workers do not oversubscribe them), then warm up the pipeline.
+    """
+    set_num_threads(max(1, (os.cpu_count() or 1) // MESH_WORKERS))
+    warm_up_mesh_pipeline()
+
+# Process pool for CPU-bound mesh work (keeps the event loop responsive);
+# spawned rather than forked, as numba's thread pool is not fork-safe.
+# Each warmed-up worker holds ~265 MB, so the default is capped; numba
+# threads split the CPUs between the workers either way
+MESH_WORKERS = int(os.environ.get("MESH_WORKERS", min(4, os.cpu_count() or 1)))
+mesh_executor = ProcessPoolExecutor(
+    max_workers=MESH_WORKERS,
+    mp_context=multiprocessing.get_context("spawn"),
+    initializer=init_mesh_worker
+)
+
+@app.on_event("startup")
+async def start_mesh_workers():
+    """Start (and so warm up) every mesh worker before serving requests."""
+    await asyncio.gather(*(run_in_mesh_executor(os.getpid) for _ in range(MESH_WORKERS)))
+    logger.info(f"Started {MESH_WORKERS} mesh workers")
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    """Stop the mesh worker processes."""
+    mesh_executor.shutdown(wait=False, cancel_futures=True)
+
+async def run_in_mesh_executor(func, *args):
+    """Run a picklable function in the mesh process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(mesh_executor, func, *args)
 
 @app.post("/api/upload_model")
 async def upload_model(file: UploadFile = File(...)):
@@ -211,40 +836,38 @@ async def upload_model(file: UploadFile = File(...)):
     
     logger.info(f"Received upload request for: {file.filename}")
     
-    # Validate file size (50MB limit)
-    content = await file.read()
-    file_size = len(content)
-    
-    if file_size > 50 * 1024 * 1024:
-        raise HTTPException(status_code=413, detail="File too large. Maximum size is 50MB.")
-    
     # Generate unique filename
     file_id = str(uuid.uuid4())
     file_extension = Path(file.filename or "model").suffix.lower()
     temp_filename = f"{file_id}{file_extension}"
     temp_path = UPLOAD_DIR / temp_filename
+    cache_prefix = str(UPLOAD_DIR / file_id)
     
     try:
-        # Save uploaded file
-        async with aiofiles.open(temp_path, 'wb') as f:
-            await f.write(content)
+        # Stream uploaded file to disk in one thread hop, enforcing the 50MB limit as we go
+        file_size, content_hash = await anyio.to_thread.run_sync(save_upload, file.file, temp_path)
+        
+        if file_size > MAX_UPLOAD_SIZE:
+            await anyio.to_thread.run_sync(os.remove, temp_path)
+            raise HTTPException(status_code=413, detail="File too large. Maximum size is 50MB.")
         
         logger.info(f"File saved to: {temp_path} ({file_size} bytes)")
         
         # Validate file type
-        if not validate_3d_file(str(temp_path)):
-            if temp_path.exists():
-                os.remove(temp_path)
+        if not await run_in_mesh_executor(validate_3d_file, str(temp_path), cache_prefix):
+            await anyio.to_thread.run_sync(remove_files, [str(temp_path), *mesh_cache_paths(cache_prefix)])
             raise HTTPException(status_code=400, detail="Invalid file type. Please upload .obj, .stl, or .ply files.")
         
         # Store file information
-        file_storage[file.filename] = {
+        await store_file_info(file_id, {
             'id': file_id,
             'original_name': file.filename,
             'temp_path': str(temp_path),
+            'cache_prefix': cache_prefix,
             'size': file_size,
+            'hash': content_hash,
             'status': 'uploaded'
-        }
+        })
         
         logger.info(f"File {file.filename} uploaded and validated successfully")
         
@@ -259,8 +882,7 @@ async def upload_model(file: UploadFile = File(...)):
         raise
     except Exception as e:
         # Clean up on error
-        if temp_path.exists():
-            os.remove(temp_path)
+        await anyio.to_thread.run_sync(remove_files, [str(temp_path), *mesh_cache_paths(cache_prefix)])
         logger.error(f"Upload failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
@@ -268,43 +890,54 @@ async def upload_model(file: UploadFile = File(...)):
 async def optimize_mesh(request: dict):
     """Remove inner mesh and optimize to create outer shell only."""
     
-    filename = request.get('filename')
-    logger.info(f"Starting optimization for: {filename}")
+    file_id = request.get('file_id')
+    logger.info(f"Starting optimization for: {file_id}")
     
-    if not filename or filename not in file_storage:
-        logger.error(f"File not found in storage: {filename}")
+    file_info = await get_file_info(file_id)
+    if file_info is None:
+        logger.error(f"File not found in storage: {file_id}")
         raise HTTPException(status_code=404, detail="File not found")
     
-    file_info = file_storage[filename]
     input_path = file_info['temp_path']
     
     if not os.path.exists(input_path):
         logger.error(f"Input file does not exist: {input_path}")
         raise HTTPException(status_code=404, detail="Input file not found")
     
-    # Generate output path
-    output_filename = f"{file_info['id']}_outer_shell.glb"
+    # Generate output path (keyed by content and pipeline settings, so identical uploads share it)
+    output_filename = f"{file_info['hash']}_v{PIPELINE_VERSION}_r{SHELL_RESOLUTION}_outer_shell.glb"
     output_path = PROCESSED_DIR / output_filename
+    gzip_path = f"{output_path}.gz"
     
     try:
-        logger.info(f"Processing: {input_path} -> {output_path}")
-        
-        # Remove inner mesh and create outer shell
-        success = remove_inner_mesh_simple(input_path, str(output_path))
-        
-        if not success:
-            raise HTTPException(status_code=500, detail="Mesh optimization failed")
+        if output_path.exists():
+            logger.info(f"Reusing existing output for identical upload: {output_path}")
+        else:
+            logger.info(f"Processing: {input_path} -> {output_path}")
+            
+            # Remove inner mesh and create outer shell
+            success = await run_in_mesh_executor(
+                remove_inner_mesh_simple, input_path, str(output_path), file_info.get('cache_prefix')
+            )
+            
+            if not success:
+                raise HTTPException(status_code=500, detail="Mesh optimization failed")
         
         # Update file storage
-        file_storage[filename]['output_path'] = str(output_path)
-        file_storage[filename]['output_filename'] = output_filename
-        file_storage[filename]['status'] = 'optimized'
+        await update_file_info(file_info, {
+            'output_path': str(output_path),
+            'output_filename': output_filename,
+            'stat': os.stat(output_path),
+            'gzip_stat': os.stat(gzip_path) if os.path.exists(gzip_path) else None,
+            'status': 'optimized'
+        })
         
-        logger.info(f"Optimization completed successfully for {filename}")
+        logger.info(f"Optimization completed successfully for {file_id}")
         
         return {
             "message": "Mesh optimized successfully - outer shell created",
-            "filename": filename,
+            "file_id": file_id,
+            "filename": file_info['original_name'],
             "output_file": output_filename,
             "status": "optimized"
         }
@@ -312,44 +945,64 @@ async def optimize_mesh(request: dict):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Optimization failed for {filename}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Optimization failed for {file_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Optimization failed: {str(e)}")
 
 @app.post("/api/download_glb")
-async def download_glb(request: dict):
+async def download_glb(request: dict, accept_encoding: Optional[str] = Header(None)):
     """Download the optimized GLB file."""
     
-    filename = request.get('filename')
-    logger.info(f"Download request for: {filename}")
+    file_id = request.get('file_id')
+    logger.info(f"Download request for: {file_id}")
     
-    if not filename or filename not in file_storage:
-        logger.error(f"File not found for download: {filename}")
+    file_info = await get_file_info(file_id)
+    if file_info is None:
+        logger.error(f"File not found for download: {file_id}")
         raise HTTPException(status_code=404, detail="File not found")
     
-    file_info = file_storage[filename]
-    
     if file_info['status'] != 'optimized' or 'output_path' not in file_info:
-        logger.error(f"File not optimized yet: {filename}")
+        logger.error(f"File not optimized yet: {file_id}")
         raise HTTPException(status_code=400, detail="File not yet optimized")
     
+    # Stat cached at optimize time; stored files only go away together with their entry
     output_path = file_info['output_path']
     
-    if not os.path.exists(output_path):
-        logger.error(f"Output file missing: {output_path}")
-        raise HTTPException(status_code=404, detail="Optimized file not found")
-    
     # Generate download filename
     original_name = Path(file_info['original_name']).stem
     download_filename = f"{original_name}_outer_shell.glb"
     
     logger.info(f"Serving download: {download_filename} from {output_path}")
     
+    if ACCEL_REDIRECT_PREFIX:
+        # Same Content-Disposition encoding as FileResponse
+        quoted_filename = quote(download_filename)
+        if quoted_filename != download_filename:
+            content_disposition = f"attachment; filename*=utf-8''{quoted_filename}"
+        else:
+            content_disposition = f'attachment; filename="{download_filename}"'
+        return Response(headers={
+            'X-Accel-Redirect': f"{ACCEL_REDIRECT_PREFIX.rstrip('/')}/{file_info['output_filename']}",
+            'Content-Disposition': content_disposition,
+            'Content-Type': 'model/gltf-binary'
+        })
+    
+    # Serve the copy gzipped at export when the client accepts it (Nginx does the
+    # same for X-Accel-Redirect with gzip_static)
+    if file_info.get('gzip_stat') is not None and 'gzip' in (accept_encoding or ''):
+        return FileResponse(
+            path=f"{output_path}.gz",
+            filename=download_filename,
+            media_type='model/gltf-binary',
+            stat_result=file_info['gzip_stat'],
+            headers={'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'}
+        )
+    
     return FileResponse(
         path=output_path,
         filename=download_filename,
-        media_type='model/gltf-binary'
+        media_type='model/gltf-binary',
+        stat_result=file_info['stat'],
+        headers={'Vary': 'Accept-Encoding'}
     )
 
 @app.get("/api/health")
@@ -359,10 +1012,20 @@ async def health_check():
 
 @app.get("/api/status")
 async def get_status():
-    """Get current status of all files."""
+    """Get the number of tracked files."""
+    return {"files": len(file_storage)}
+
+@app.get("/api/status/{file_id}")
+async def get_file_status(file_id: str):
+    """Get the status of a single file."""
+    file_info = await get_file_info(file_id)
+    if file_info is None:
+        raise HTTPException(status_code=404, detail="File not found")
     return {
-        "files": len(file_storage),
-        "storage": dict(file_storage)
+        "file_id": file_id,
+        "filename": file_info['original_name'],
+        "size": file_info['size'],
+        "status": file_info['status']
     }
 
 @app.delete("/api/cleanup")
@@ -372,19 +1035,16 @@ async def cleanup_files():
         logger.info("Starting cleanup...")
         
         # Clear file storage
-        file_storage.clear()
+        async with storage_lock:
+            file_storage.clear()
         
         # Remove uploaded files
-        for file_path in UPLOAD_DIR.glob("*"):
-            if file_path.is_file():
-                os.remove(file_path)
-                logger.info(f"Removed upload: {file_path}")
+        removed = await anyio.to_thread.run_sync(clear_directory, UPLOAD_DIR)
+        logger.info(f"Removed {removed} uploaded files")
         
         # Remove processed files
-        for file_path in PROCESSED_DIR.glob("*"):
-            if file_path.is_file():
-                os.remove(file_path)
-                logger.info(f"Removed processed: {file_path}")
+        removed = await anyio.to_thread.run_sync(clear_directory, PROCESSED_DIR)
+        logger.info(f"Removed {removed} processed files")
         
         logger.info("Cleanup completed successfully")
         
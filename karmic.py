@@ -15,25 +15,23 @@ input_filename = list(uploaded.keys())[0]
 mesh = o3d.io.read_triangle_mesh(input_filename)
 mesh.compute_vertex_normals()
 
-# Step 3: Convert the mesh to a voxel grid
+# Step 3: Sample the surface densely (~8 points per voxel_size^2 of area)
 voxel_size = 1.0  # You can adjust this for more/less detail
-voxel_grid = o3d.geometry.VoxelGrid.create_from_triangle_mesh(mesh, voxel_size=voxel_size)
-
-# Step 4: Convert voxel grid to dense point cloud
-voxel_points = [voxel.grid_index for voxel in voxel_grid.get_voxels()]
-voxel_points = np.array(voxel_points, dtype=np.float32)
-voxel_points *= voxel_size
-pcd = o3d.geometry.PointCloud()
-pcd.points = o3d.utility.Vector3dVector(voxel_points)
-
-# Step 5: Estimate normals for point cloud
-pcd.estimate_normals(search_param=o3d.geometry.KDTreeSearchParamHybrid(radius=2.0, max_nn=30))
-
-# Step 6: Surface reconstruction using Ball Pivoting (more accurate shell)
-radii = [voxel_size * 1.5]
-mesh_shell = o3d.geometry.TriangleMesh.create_from_point_cloud_ball_pivoting(
-    pcd, o3d.utility.DoubleVector(radii)
-)
+number_of_points = int(np.ceil(8 * mesh.get_surface_area() / voxel_size ** 2))
+surface_points = mesh.sample_points_uniformly(number_of_points=number_of_points)
+
+# Step 4: Voxelize into a point cloud with one point per occupied voxel
+pcd = surface_points.voxel_down_sample(voxel_size)
+
+# Step 5: Estimate normals for point cloud (on the GPU when available)
+device = o3d.core.Device("CUDA:0" if o3d.core.cuda.is_available() else "CPU:0")
+pcd_t = o3d.t.geometry.PointCloud.from_legacy(pcd).to(device)
+pcd_t.estimate_normals(max_nn=30, radius=2.0 * voxel_size)
+pcd = pcd_t.cpu().to_legacy()
+pcd.orient_normals_consistent_tangent_plane(30)  # Poisson needs consistently oriented normals
+
+# Step 6: Surface reconstruction using Poisson (watertight, unlike Ball Pivoting)
+mesh_shell, _ = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(pcd, depth=8)
 
 # Step 7: Save the new outer shell mesh
 output_path = "outer_shell.obj"
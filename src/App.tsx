@@ -87,7 +87,7 @@ function App() {
       const optimizeResponse = await fetch('/api/optimize_mesh', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ filename: file.name }),
+        body: JSON.stringify({ file_id: uploadResult.file_id }),
       });
 
       console.log('Optimize response status:', optimizeResponse.status);
@@ -114,7 +114,7 @@ function App() {
       const downloadResponse = await fetch('/api/download_glb', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ filename: file.name }),
+        body: JSON.stringify({ file_id: uploadResult.file_id }),
       });
 
       console.log('Download response status:', downloadResponse.status);